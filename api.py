@@ -6,13 +6,43 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'frontend'))
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from datetime import date
-from frontend.db_helper import fetch_expenses_for_date, insert_expense, delete_expenses_for_date, fetch_expense_summary
-from typing import List
+from frontend.db_helper import (
+    fetch_expenses_for_date, insert_expense, delete_expenses_for_date, fetch_expense_summary,
+    read_changes, fetch_compaction_state, compact_changes,
+)
+from frontend.summary_precompute import SummaryPrecomputer, DEFAULT_RANGES
+from typing import List, Optional
 from pydantic import BaseModel
 
-app = FastAPI(title="Expense Tracking API", version="1.0.0")
+# The change log lives in the database, so writes from any process (API or
+# Streamlit) are picked up by polling it rather than by in-process signals.
+CHANGES_POLL_INTERVAL = 0.5
+CHANGES_HEARTBEAT_INTERVAL = 15
+
+# Rolling dashboard ranges kept warm in the background; set PRECOMPUTE_RANGES="" to disable
+precomputer = SummaryPrecomputer(
+    range_names=[name for name in os.getenv("PRECOMPUTE_RANGES", ",".join(DEFAULT_RANGES)).split(",") if name],
+    interval=float(os.getenv("PRECOMPUTE_INTERVAL", str(CHANGES_POLL_INTERVAL))),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(precomputer.start)
+    try:
+        yield
+    finally:
+        await run_in_threadpool(precomputer.stop)
+
+
+app = FastAPI(title="Expense Tracking API", version="1.0.0", lifespan=lifespan)
 
 
 class Expense(BaseModel):
@@ -44,12 +74,15 @@ def add_or_update_expense(expense_date: date, expenses: List[Expense]):
     delete_expenses_for_date(expense_date)
     for expense in expenses:
         insert_expense(expense_date, expense.amount, expense.category, expense.notes)
+    precomputer.invalidate(expense_date)
     return {"message": "Expenses updated successfully"}
 
 
 @app.post("/analytics/")
 def get_analytics(date_range: DateRange):
-    data = fetch_expense_summary(date_range.start_date, date_range.end_date)
+    data = precomputer.lookup(date_range.start_date, date_range.end_date)
+    if data is None:
+        data = fetch_expense_summary(date_range.start_date, date_range.end_date)
     if data is None:
         raise HTTPException(status_code=500, detail="Failed to retrieve expense summary from the database.")
 
@@ -66,6 +99,86 @@ def get_analytics(date_range: DateRange):
     return breakdown
 
 
+@app.get("/analytics/metrics")
+def get_analytics_metrics():
+    return precomputer.metrics()
+
+
+async def _read_changes(since: int, limit: int, epoch: Optional[int]):
+    result = await run_in_threadpool(read_changes, since, limit, epoch)
+    if result['stale']:
+        raise HTTPException(
+            status_code=410,
+            detail="Position predates a log compaction; resync from since=0.",
+        )
+    return result
+
+
+@app.get("/changes")
+async def get_changes(since: int = Query(0, ge=0), limit: int = Query(500, ge=1, le=5000),
+                      timeout: float = Query(0, ge=0, le=60), epoch: Optional[int] = Query(None)):
+    """Return changes after `since`; with `timeout` > 0, long-poll until changes arrive.
+
+    Send back the `epoch` of the previous response along with its `last_seq`.
+    """
+    result = await _read_changes(since, limit, epoch)
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not result['changes'] and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(CHANGES_POLL_INTERVAL)
+        result = await _read_changes(since, limit, epoch)
+
+    changes = result['changes']
+    last_seq = changes[-1]['seq'] if changes else since
+    return {"changes": changes, "last_seq": last_seq, "epoch": result['epoch']}
+
+
+@app.get("/changes/stream")
+async def stream_changes(since: int = Query(0, ge=0), epoch: Optional[int] = Query(None),
+                         last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events stream of changes after `since` (or the `Last-Event-ID` header).
+
+    Event ids are `<epoch>:<seq>`, so a reconnecting client resumes with both.
+    """
+    if last_event_id is not None:
+        event_epoch, _, event_seq = last_event_id.partition(":")
+        if event_epoch.isdigit() and event_seq.isdigit():
+            epoch, since = int(event_epoch), int(event_seq)
+    # Surface a compacted position as a 410 before the stream starts
+    first = await _read_changes(since, 500, epoch)
+
+    async def event_source():
+        result = first
+        cursor = since
+        idle = 0.0
+        while True:
+            changes = result['changes']
+            for change in changes:
+                cursor = change['seq']
+                yield f"id: {result['epoch']}:{cursor}\nevent: change\ndata: {json.dumps(change)}\n\n"
+            if changes:
+                idle = 0.0
+            else:
+                await asyncio.sleep(CHANGES_POLL_INTERVAL)
+                idle += CHANGES_POLL_INTERVAL
+                if idle >= CHANGES_HEARTBEAT_INTERVAL:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+            try:
+                result = await _read_changes(cursor, 500, result['epoch'])
+            except HTTPException as err:
+                yield f"event: error\ndata: {json.dumps({'detail': err.detail})}\n\n"
+                return
+
+    return StreamingResponse(event_source(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/changes/compact")
+def compact_change_log(through_seq: int = Query(..., ge=1)):
+    removed = compact_changes(through_seq)
+    return {"removed": removed, **fetch_compaction_state()}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
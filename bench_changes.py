@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the expense change log.
+
+Measures how fast write paths append to `expense_changes`, how fast a
+consumer can page through the log with `read_changes`, and how long a
+compaction pass takes. Runs against a throwaway SQLite file so the real
+database in ~/.expense_manager is never touched.
+
+Usage:
+    python bench_changes.py [number_of_days]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend'))
+
+import db_helper
+
+
+def run(days=200, per_day=5, page_size=1000):
+    tmp_dir = tempfile.mkdtemp(prefix='expense_bench_')
+    db_path = os.path.join(tmp_dir, 'expenses.db')
+    db_helper._get_db_path = lambda: db_path
+    # Keep per-call INFO logging out of the timings
+    db_helper.logger.disabled = True
+
+    start_day = date(2024, 1, 1)
+    writes = days * per_day
+
+    t0 = time.perf_counter()
+    for d in range(days):
+        for i in range(per_day):
+            db_helper.insert_expense(start_day + timedelta(days=d), 10 + i, "Food", f"item {i}")
+    insert_secs = time.perf_counter() - t0
+
+    # Rewrite every day the way the API does: delete, then re-insert
+    t0 = time.perf_counter()
+    for d in range(days):
+        day = start_day + timedelta(days=d)
+        db_helper.delete_expenses_for_date(day)
+        for i in range(per_day):
+            db_helper.insert_expense(day, 20 + i, "Shopping", f"item {i}")
+    rewrite_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    since, read, epoch = 0, 0, None
+    while True:
+        result = db_helper.read_changes(since, page_size, epoch)
+        page, epoch = result['changes'], result['epoch']
+        if not page:
+            break
+        read += len(page)
+        since = page[-1]['seq']
+    read_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    removed = db_helper.compact_changes(since)
+    compact_secs = time.perf_counter() - t0
+    remaining = len(db_helper.read_changes(0, read + 1)['changes'])
+
+    print(f"Inserts:          {writes} in {insert_secs:.2f}s ({writes / insert_secs:.0f} changes/s)")
+    print(f"Delete+reinsert:  {2 * writes} changes in {rewrite_secs:.2f}s ({2 * writes / rewrite_secs:.0f} changes/s)")
+    print(f"Consumer read:    {read} changes in {read_secs:.3f}s ({read / read_secs:.0f} changes/s, page {page_size})")
+    print(f"Compaction:       removed {removed} in {compact_secs:.3f}s, {remaining} changes remain")
+
+
+if __name__ == "__main__":
+    run(days=int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -30,6 +30,10 @@ except Exception:
 
 logger = setup_logger('db_helper')
 
+# Last database path announced in the log; connections are opened per call
+# (and per poll by change feed clients), so only log when it changes.
+_logged_db_path = None
+
 
 def _get_db_path():
     """Get SQLite database file path. Create in home directory for persistence."""
@@ -42,10 +46,13 @@ def _get_db_path():
 def get_db_cursor(commit=False):
     """Context manager that yields a SQLite cursor with row_factory set to dict-like access.
 
-    Creates the `expenses` table if it doesn't exist.
+    Creates the `expenses` table and the `expense_changes` change log if they don't exist.
     """
+    global _logged_db_path
     db_path = _get_db_path()
-    logger.info(f"✅ Using SQLite database at: {db_path}")
+    if db_path != _logged_db_path:
+        logger.info(f"✅ Using SQLite database at: {db_path}")
+        _logged_db_path = db_path
 
     try:
         conn = sqlite3.connect(db_path)
@@ -65,6 +72,9 @@ def get_db_cursor(commit=False):
             )
             """
         )
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expense_changes'")
+        if cursor.fetchone() is None:
+            _create_change_log(cursor)
         conn.commit()
 
         try:
@@ -79,12 +89,64 @@ def get_db_cursor(commit=False):
         raise
 
 
+def _create_change_log(cursor):
+    """Create the change log tables and seed one `insert` per existing expense.
+
+    Seeding means a consumer replaying from seq 0 rebuilds the current state even on
+    databases that predate the change log. Runs under a write lock so two processes
+    opening such a database cannot both seed it; the caller commits.
+    """
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expense_changes'")
+    if cursor.fetchone() is not None:
+        return
+    # Ordered change log of expense mutations for downstream consumers.
+    # `seq` is AUTOINCREMENT so it never goes backwards, even after compaction.
+    # `created_at` keeps milliseconds (UTC) so consumers can measure sub-second lag.
+    cursor.execute(
+        """
+        CREATE TABLE expense_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT NOT NULL,
+            expense_id INTEGER NOT NULL,
+            expense_date DATE NOT NULL,
+            amount REAL NOT NULL,
+            category TEXT NOT NULL,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS expense_changes_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO expense_changes (op, expense_id, expense_date, amount, category, notes)
+        SELECT 'insert', id, expense_date, amount, category, notes FROM expenses ORDER BY id
+        """
+    )
+
+
 def _to_date_str(d):
     if isinstance(d, (date,)):
         return d.strftime("%Y-%m-%d")
     return str(d)
 
 
+def _log_change(cursor, op, expense_id, expense_date, amount, category, notes):
+    """Append a mutation to the change log using the caller's cursor (same transaction)."""
+    cursor.execute(
+        "INSERT INTO expense_changes (op, expense_id, expense_date, amount, category, notes) VALUES (?, ?, ?, ?, ?, ?)",
+        (op, expense_id, expense_date, amount, category, notes)
+    )
+
+
 def fetch_expenses_for_date(expense_date):
     logger.info(f"fetch_expenses_for_date called with {expense_date}")
     dstr = _to_date_str(expense_date)
@@ -98,7 +160,14 @@ def delete_expenses_for_date(expense_date):
     logger.info(f"delete_expenses_for_date called with {expense_date}")
     dstr = _to_date_str(expense_date)
     with get_db_cursor(commit=True) as cursor:
+        # Take the write lock before reading, so no other process can insert a row for
+        # this date between the SELECT and the DELETE without it being logged
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT * FROM expenses WHERE expense_date = ?", (dstr,))
+        rows = cursor.fetchall()
         cursor.execute("DELETE FROM expenses WHERE expense_date = ?", (dstr,))
+        for row in rows:
+            _log_change(cursor, 'delete', row['id'], row['expense_date'], row['amount'], row['category'], row['notes'])
 
 
 def insert_expense(expense_date, amount, category, notes):
@@ -109,6 +178,7 @@ def insert_expense(expense_date, amount, category, notes):
             "INSERT INTO expenses (expense_date, amount, category, notes) VALUES (?, ?, ?, ?)",
             (dstr, float(amount), category, notes)
         )
+        _log_change(cursor, 'insert', cursor.lastrowid, dstr, float(amount), category, notes)
 
 
 def fetch_expense_summary(start_date, end_date):
@@ -129,6 +199,97 @@ def fetch_expense_summary(start_date, end_date):
         return [dict(row) for row in rows] if rows else []
 
 
+def _compaction_state(cursor):
+    cursor.execute("SELECT key, value FROM expense_changes_meta")
+    meta = {row['key']: row['value'] for row in cursor.fetchall()}
+    return meta.get('compaction_epoch', 0), meta.get('compacted_through', 0)
+
+
+def read_changes(since=0, limit=1000, epoch=None):
+    """Return change log entries with `seq` greater than `since`, oldest first.
+
+    Pass back the `epoch` from the previous response. Positions handed out before
+    a compaction may sit between an insert and a compacted-away delete, so such a
+    position below the watermark is reported as `stale` and the consumer must
+    resync from 0. The compaction state and the changes are read in one
+    transaction, so a concurrent compaction cannot slip between them.
+    """
+    since = int(since)
+    with get_db_cursor() as cursor:
+        cursor.execute("BEGIN")
+        current_epoch, watermark = _compaction_state(cursor)
+        if 0 < since < watermark and epoch != current_epoch:
+            return {"changes": [], "epoch": current_epoch, "stale": True}
+        cursor.execute(
+            "SELECT * FROM expense_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (since, int(limit)),
+        )
+        rows = cursor.fetchall()
+        return {"changes": [dict(row) for row in rows], "epoch": current_epoch, "stale": False}
+
+
+def fetch_latest_change_seq():
+    """Return the highest `seq` in the change log (0 if empty)."""
+    with get_db_cursor() as cursor:
+        cursor.execute("SELECT MAX(seq) AS latest FROM expense_changes")
+        row = cursor.fetchone()
+        return row['latest'] or 0
+
+
+def fetch_compaction_state():
+    """Return the current compaction `epoch` and `watermark` (last delete `seq` compacted away)."""
+    with get_db_cursor() as cursor:
+        current_epoch, watermark = _compaction_state(cursor)
+        return {"epoch": current_epoch, "watermark": watermark}
+
+
+def compact_changes(through_seq):
+    """Drop insert/delete pairs for the same expense when both are at or below `through_seq`.
+
+    Such pairs cancel out for any consumer replaying from 0 or resuming past the
+    watermark, so removing them keeps the log proportional to live expenses.
+    Each compaction that removes rows starts a new epoch (see `read_changes`).
+    Returns the number of change log rows removed.
+    """
+    logger.info(f"compact_changes called with through_seq: {through_seq}")
+    through_seq = int(through_seq)
+    with get_db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "SELECT MAX(seq) AS last_delete FROM expense_changes WHERE op = 'delete' AND seq <= ?",
+            (through_seq,),
+        )
+        last_delete = cursor.fetchone()['last_delete']
+        if last_delete is None:
+            return 0
+        cursor.execute(
+            """
+            DELETE FROM expense_changes
+            WHERE seq <= ? AND expense_id IN (
+                SELECT expense_id FROM expense_changes
+                WHERE op = 'delete' AND seq <= ?
+            );
+            """,
+            (last_delete, last_delete),
+        )
+        removed = cursor.rowcount
+        if removed == 0:
+            return 0
+        cursor.execute(
+            """
+            INSERT INTO expense_changes_meta (key, value) VALUES ('compacted_through', ?)
+            ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value);
+            """,
+            (last_delete,),
+        )
+        cursor.execute(
+            """
+            INSERT INTO expense_changes_meta (key, value) VALUES ('compaction_epoch', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+            """
+        )
+        return removed
+
+
 if __name__ == "__main__":
     # Quick local smoke test
     from datetime import date
@@ -141,5 +302,6 @@ if __name__ == "__main__":
         insert_expense(today, 100, "Shopping", "Books")
         print("Expenses for today:", fetch_expenses_for_date(today))
         print("Summary:", fetch_expense_summary(today, today))
+        print("Changes:", read_changes(0, limit=10)["changes"])
     except Exception as e:
         print(f"Error: {e}")
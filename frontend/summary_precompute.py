@@ -0,0 +1,227 @@
+"""
+Background precomputation of expense summaries for common dashboard ranges.
+
+A daemon thread keeps `fetch_expense_summary` results for rolling ranges
+(this month, last month, YTD, trailing 30 days) warm. It polls the
+`expense_changes` log so writes from any process refresh the ranges they
+touch, and `get_analytics` serves a snapshot when the requested range matches
+and no write is known to be pending for it.
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    from frontend import db_helper
+except ImportError:
+    import db_helper
+
+# Make logging_setup import resilient to different working directories
+try:
+    from logging_setup import setup_logger
+except Exception:
+    try:
+        from .logging_setup import setup_logger
+    except Exception:
+        def setup_logger(name: str):
+            import logging
+            logger = logging.getLogger(name)
+            if not logger.handlers:
+                handler = logging.StreamHandler()
+                fmt = "%(asctime)s %(levelname)s %(message)s"
+                handler.setFormatter(logging.Formatter(fmt))
+                logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            return logger
+
+logger = setup_logger('summary_precompute')
+
+DEFAULT_RANGES = ("this_month", "last_month", "ytd", "trailing_30_days")
+
+# Longest wait between refresh attempts while they keep failing (e.g. database unavailable)
+MAX_RETRY_INTERVAL = 30
+
+
+def rolling_ranges(today):
+    """Return {name: (start_date, end_date)} for every supported rolling range."""
+    first_of_month = today.replace(day=1)
+    last_month_end = first_of_month - timedelta(days=1)
+    return {
+        "this_month": (first_of_month, today),
+        "last_month": (last_month_end.replace(day=1), last_month_end),
+        "ytd": (today.replace(month=1, day=1), today),
+        "trailing_30_days": (today - timedelta(days=29), today),
+    }
+
+
+def _change_timestamp(change):
+    """Epoch seconds of a change log row (UTC, milliseconds; whole seconds on older logs)."""
+    created = datetime.fromisoformat(change['created_at'])
+    return created.replace(tzinfo=timezone.utc).timestamp()
+
+
+class SummaryPrecomputer:
+    """Keeps summaries for configured rolling ranges fresh in a background thread.
+
+    Freshness lag is the time from a write to the refreshed snapshot of a range it
+    touched. Writes from other processes are timed from their change log
+    `created_at`; in-process writes from the `invalidate()` call.
+    """
+
+    def __init__(self, range_names=DEFAULT_RANGES, interval=0.5, today=date.today):
+        unknown = set(range_names) - set(DEFAULT_RANGES)
+        if unknown:
+            raise ValueError(f"Unknown precompute ranges: {', '.join(sorted(unknown))}")
+        self.range_names = tuple(range_names)
+        self.interval = interval
+        self._today = today
+
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._generation = {name: 0 for name in self.range_names}
+        self._stale_since = {}
+        self._last_seq = 0
+        self._epoch = None
+        self._hits = 0
+        self._misses = 0
+        self._last_lag = None
+        self._max_lag = None
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or not self.range_names:
+            return
+        # Changes already in the log are reflected by the first refresh
+        self._epoch = db_helper.fetch_compaction_state()['epoch']
+        self._last_seq = db_helper.fetch_latest_change_seq()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="summary-precompute", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        # Each pass is a cheap change log poll; summaries are only recomputed for touched ranges
+        failures = 0
+        while not self._stop.is_set():
+            # Clear before refreshing so an invalidate() during the pass triggers another one
+            self._wakeup.clear()
+            try:
+                self.refresh()
+            except Exception as err:
+                failures += 1
+                # Log the first failure and the recovery, not every retry during an outage
+                if failures == 1:
+                    logger.error(f"Summary precompute refresh failed, backing off: {err}")
+            else:
+                if failures:
+                    logger.info(f"Summary precompute recovered after {failures} failed refreshes")
+                failures = 0
+            wait = min(self.interval * 2 ** min(failures, 16), MAX_RETRY_INTERVAL) if failures else self.interval
+            self._wakeup.wait(wait)
+
+    def _current_ranges(self):
+        ranges = rolling_ranges(self._today())
+        return {name: ranges[name] for name in self.range_names}
+
+    def _read_new_changes(self):
+        """Drain the change log past `_last_seq`; None means our position was compacted away."""
+        changes = []
+        while True:
+            result = db_helper.read_changes(self._last_seq, 1000, self._epoch)
+            self._epoch = result['epoch']
+            if result['stale']:
+                self._last_seq = db_helper.fetch_latest_change_seq()
+                return None
+            if not result['changes']:
+                return changes
+            changes.extend(result['changes'])
+            self._last_seq = result['changes'][-1]['seq']
+
+    def refresh(self):
+        """Recompute every range that is missing, has rolled over, or was touched by a write."""
+        ranges = self._current_ranges()
+        changes = self._read_new_changes()
+
+        with self._lock:
+            for name, (start, end) in ranges.items():
+                snapshot = self._snapshots.get(name)
+                if snapshot is None or (snapshot['start'], snapshot['end']) != (start, end):
+                    self._stale_since.setdefault(name, time.time())
+            for change in changes if changes is not None else []:
+                expense_date = date.fromisoformat(change['expense_date'])
+                for name, (start, end) in ranges.items():
+                    if start <= expense_date <= end:
+                        stale_since = min(self._stale_since.get(name, time.time()), _change_timestamp(change))
+                        self._stale_since[name] = stale_since
+            if changes is None:
+                for name in ranges:
+                    self._stale_since.setdefault(name, time.time())
+            pending = {name: self._generation[name] for name in self._stale_since}
+
+        for name, generation in pending.items():
+            start, end = ranges[name]
+            data = db_helper.fetch_expense_summary(start, end)
+            with self._lock:
+                # An in-process write landed while we were computing; the next pass redoes it
+                if self._generation[name] != generation:
+                    continue
+                now = time.time()
+                self._snapshots[name] = {"start": start, "end": end, "data": data, "computed_at": now}
+                lag = now - self._stale_since.pop(name)
+                self._last_lag = lag
+                self._max_lag = lag if self._max_lag is None else max(self._max_lag, lag)
+
+    def invalidate(self, expense_date):
+        """Drop snapshots covering `expense_date` after an in-process write and wake the thread."""
+        with self._lock:
+            for name, (start, end) in self._current_ranges().items():
+                if start <= expense_date <= end:
+                    self._snapshots.pop(name, None)
+                    self._generation[name] += 1
+                    self._stale_since.setdefault(name, time.time())
+        self._wakeup.set()
+
+    def lookup(self, start_date, end_date):
+        """Return the precomputed summary for exactly this range, or None on a miss.
+
+        Ranges with a write pending refresh miss, so the caller queries fresh data.
+        """
+        with self._lock:
+            for name, snapshot in self._snapshots.items():
+                if name in self._stale_since:
+                    continue
+                if snapshot['start'] == start_date and snapshot['end'] == end_date:
+                    self._hits += 1
+                    return snapshot['data']
+            self._misses += 1
+            return None
+
+    def metrics(self):
+        with self._lock:
+            requests = self._hits + self._misses
+            now = time.time()
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / requests if requests else 0.0,
+                "last_freshness_lag_seconds": self._last_lag,
+                "max_freshness_lag_seconds": self._max_lag,
+                "ranges": {
+                    name: {
+                        "start_date": snapshot['start'],
+                        "end_date": snapshot['end'],
+                        "age_seconds": now - snapshot['computed_at'],
+                        "stale": name in self._stale_since,
+                    }
+                    for name, snapshot in self._snapshots.items()
+                },
+            }
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Mirror api.py: the repo root and frontend/ are both importable
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'frontend'))
+
+from frontend import db_helper
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point db_helper at a throwaway SQLite file."""
+    db_path = str(tmp_path / 'expenses.db')
+    monkeypatch.setattr(db_helper, '_get_db_path', lambda: db_path)
+    return db_path
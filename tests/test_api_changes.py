@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import api
+from frontend import db_helper
+
+
+@pytest.fixture
+def client(temp_db, monkeypatch):
+    monkeypatch.setattr(api, 'CHANGES_POLL_INTERVAL', 0.05)
+    return TestClient(api.app)
+
+
+def _write_then_rewrite(days):
+    for d in range(1, days + 1):
+        db_helper.insert_expense(date(2024, 8, d), 10, "Food", "first")
+    for d in range(1, days + 1):
+        db_helper.delete_expenses_for_date(date(2024, 8, d))
+        db_helper.insert_expense(date(2024, 8, d), 20, "Rent", "second")
+
+
+def _stream_events(since=0, epoch=None, last_event_id=None, count=1, after_first=None):
+    """Call stream_changes directly and collect `count` chunks (TestClient buffers endless bodies)."""
+    async def collect():
+        response = await api.stream_changes(since=since, epoch=epoch, last_event_id=last_event_id)
+        chunks = []
+        try:
+            async for chunk in response.body_iterator:
+                chunks.append(chunk)
+                if len(chunks) == 1 and after_first:
+                    await asyncio.to_thread(after_first)
+                if len(chunks) == count:
+                    break
+        finally:
+            await response.body_iterator.aclose()
+        return chunks
+
+    return asyncio.run(collect())
+
+
+def test_changes_pages_with_last_seq_and_epoch(client):
+    db_helper.insert_expense(date(2024, 8, 1), 5, "Food", "a")
+    db_helper.insert_expense(date(2024, 8, 2), 6, "Food", "b")
+
+    first = client.get("/changes", params={"since": 0, "limit": 1}).json()
+    second = client.get("/changes", params={"since": first['last_seq'], "epoch": first['epoch']}).json()
+
+    assert [c['notes'] for c in first['changes']] == ['a']
+    assert first['last_seq'] == first['changes'][0]['seq']
+    assert first['epoch'] == 0
+    assert [c['notes'] for c in second['changes']] == ['b']
+    assert second['last_seq'] == second['changes'][0]['seq']
+
+
+def test_empty_changes_echo_since(client):
+    body = client.get("/changes", params={"since": 7}).json()
+
+    assert body == {"changes": [], "last_seq": 7, "epoch": 0}
+
+
+def test_long_poll_waits_for_timeout(client):
+    started = time.monotonic()
+    body = client.get("/changes", params={"timeout": 0.3}).json()
+
+    assert body['changes'] == []
+    assert time.monotonic() - started >= 0.3
+
+
+def test_long_poll_returns_when_a_change_arrives(client):
+    writer = threading.Timer(0.2, db_helper.insert_expense, (date(2024, 8, 1), 5, "Food", "late"))
+    writer.start()
+    started = time.monotonic()
+    body = client.get("/changes", params={"timeout": 10}).json()
+    writer.join()
+
+    assert [c['notes'] for c in body['changes']] == ['late']
+    assert time.monotonic() - started < 5
+
+
+def test_compact_endpoint_and_410_for_stale_position(client):
+    _write_then_rewrite(3)
+    first = client.get("/changes", params={"limit": 1}).json()
+
+    compacted = client.post("/changes/compact", params={"through_seq": 100}).json()
+    stale = client.get("/changes", params={"since": first['last_seq'], "epoch": first['epoch']})
+    replay = client.get("/changes", params={"since": 0}).json()
+
+    assert compacted == {"removed": 6, "epoch": 1, "watermark": 8}
+    assert stale.status_code == 410
+    assert [c['notes'] for c in replay['changes']] == ['second'] * 3
+    assert replay['epoch'] == 1
+
+
+def test_compact_requires_positive_through_seq(client):
+    assert client.post("/changes/compact", params={"through_seq": 0}).status_code == 422
+
+
+def test_stream_frames_events_with_epoch_and_seq(client):
+    db_helper.insert_expense(date(2024, 8, 1), 5, "Food", "a")
+    db_helper.insert_expense(date(2024, 8, 2), 6, "Food", "b")
+
+    chunks = _stream_events(count=2)
+
+    assert chunks[0].startswith("id: 0:1\nevent: change\ndata: {")
+    assert '"notes": "a"' in chunks[0] and chunks[0].endswith("\n\n")
+    assert chunks[1].startswith("id: 0:2\n")
+
+
+def test_stream_resumes_from_last_event_id(client):
+    for notes in ("a", "b", "c"):
+        db_helper.insert_expense(date(2024, 8, 1), 5, "Food", notes)
+
+    chunks = _stream_events(since=0, last_event_id="0:2")
+
+    assert chunks[0].startswith("id: 0:3\n")
+
+
+def test_stream_ignores_malformed_last_event_id(client):
+    db_helper.insert_expense(date(2024, 8, 1), 5, "Food", "a")
+
+    chunks = _stream_events(since=0, last_event_id="garbage")
+
+    assert chunks[0].startswith("id: 0:1\n")
+
+
+def test_stream_sends_heartbeat_when_idle(client, monkeypatch):
+    monkeypatch.setattr(api, 'CHANGES_HEARTBEAT_INTERVAL', 0.1)
+
+    assert _stream_events() == [": keep-alive\n\n"]
+
+
+def test_stream_rejects_stale_last_event_id_before_streaming(client):
+    _write_then_rewrite(3)
+    db_helper.compact_changes(100)
+
+    response = client.get("/changes/stream", headers={"Last-Event-ID": "0:1"})
+
+    assert response.status_code == 410
+
+
+def test_stream_reports_compaction_mid_stream_and_closes(client):
+    db_helper.insert_expense(date(2024, 8, 1), 5, "Food", "a")
+
+    def compact_past_cursor():
+        db_helper.delete_expenses_for_date(date(2024, 8, 1))
+        db_helper.compact_changes(100)
+
+    chunks = _stream_events(count=3, after_first=compact_past_cursor)
+
+    assert chunks[0].startswith("id: 0:1\n")
+    assert chunks[1].startswith("event: error\n")
+    assert len(chunks) == 2
+
+
+def test_stream_raises_410_for_stale_since(temp_db):
+    _write_then_rewrite(3)
+    db_helper.compact_changes(100)
+
+    with pytest.raises(HTTPException) as err:
+        _stream_events(since=1, epoch=0)
+    assert err.value.status_code == 410
@@ -0,0 +1,160 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from frontend import db_helper
+
+
+def _write_then_rewrite(days):
+    start = date(2024, 8, 1)
+    for d in range(days):
+        db_helper.insert_expense(start + timedelta(days=d), 10, "Food", "first")
+    for d in range(days):
+        db_helper.delete_expenses_for_date(start + timedelta(days=d))
+        db_helper.insert_expense(start + timedelta(days=d), 20, "Rent", "second")
+
+
+def _page_all(since=0, epoch=None, limit=10):
+    seen = []
+    while True:
+        result = db_helper.read_changes(since, limit, epoch)
+        assert not result['stale']
+        if not result['changes']:
+            return seen, since, epoch
+        seen.extend(result['changes'])
+        since, epoch = seen[-1]['seq'], result['epoch']
+
+
+def test_insert_and_delete_are_logged_in_order(temp_db):
+    db_helper.insert_expense(date(2024, 8, 1), 12.5, "Food", "Coffee")
+    db_helper.delete_expenses_for_date(date(2024, 8, 1))
+
+    changes = db_helper.read_changes(0)['changes']
+
+    assert [c['op'] for c in changes] == ['insert', 'delete']
+    assert changes[0]['seq'] < changes[1]['seq']
+    assert changes[0]['expense_id'] == changes[1]['expense_id']
+
+
+def test_change_timestamps_keep_milliseconds(temp_db):
+    db_helper.insert_expense(date(2024, 8, 1), 12.5, "Food", "Coffee")
+
+    created_at = db_helper.read_changes(0)['changes'][0]['created_at']
+
+    assert len(created_at.split('.')[1]) == 3
+
+
+def test_compact_then_page_from_zero_with_small_limit(temp_db):
+    _write_then_rewrite(10)
+    latest = db_helper.fetch_latest_change_seq()
+
+    removed = db_helper.compact_changes(latest)
+    seen, _, _ = _page_all(limit=3)
+
+    assert removed == 20
+    assert [c['op'] for c in seen] == ['insert'] * 10
+    assert {c['notes'] for c in seen} == {'second'}
+
+
+def test_position_issued_before_compaction_is_stale(temp_db):
+    _write_then_rewrite(3)
+    first = db_helper.read_changes(0, 1)
+    position, epoch = first['changes'][0]['seq'], first['epoch']
+
+    db_helper.compact_changes(db_helper.fetch_latest_change_seq())
+
+    assert db_helper.read_changes(position, 10, epoch)['stale']
+
+
+def test_position_past_watermark_survives_compaction(temp_db):
+    _write_then_rewrite(3)
+    _, position, epoch = _page_all()
+
+    db_helper.compact_changes(position)
+    db_helper.insert_expense(date(2024, 9, 1), 5, "Other", "after")
+    result = db_helper.read_changes(position, 10, epoch)
+
+    assert not result['stale']
+    assert [c['notes'] for c in result['changes']] == ['after']
+
+
+def test_existing_expenses_are_seeded_into_new_change_log(temp_db):
+    conn = sqlite3.connect(temp_db)
+    conn.execute(
+        "CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, expense_date DATE NOT NULL, "
+        "amount REAL NOT NULL, category TEXT NOT NULL, notes TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    conn.execute("INSERT INTO expenses (expense_date, amount, category, notes) VALUES ('2024-08-01', 50, 'Food', 'old')")
+    conn.commit()
+    conn.close()
+
+    db_helper.delete_expenses_for_date(date(2024, 8, 1))
+    changes = db_helper.read_changes(0)['changes']
+
+    assert [(c['op'], c['notes']) for c in changes] == [('insert', 'old'), ('delete', 'old')]
+
+
+class _InterleavingCursor:
+    """Cursor proxy that commits an insert from a second connection just before any DELETE."""
+
+    def __init__(self, cursor, db_path):
+        self._cursor = cursor
+        self._db_path = db_path
+        self.interleaved = None
+
+    def execute(self, sql, params=()):
+        if sql.startswith("DELETE FROM expenses"):
+            other = sqlite3.connect(self._db_path, timeout=0)
+            try:
+                # Same statements insert_expense runs in another process
+                cur = other.execute(
+                    "INSERT INTO expenses (expense_date, amount, category, notes) VALUES ('2024-08-01', 7, 'Food', 'b')"
+                )
+                other.execute(
+                    "INSERT INTO expense_changes (op, expense_id, expense_date, amount, category, notes) "
+                    "VALUES ('insert', ?, '2024-08-01', 7, 'Food', 'b')",
+                    (cur.lastrowid,),
+                )
+                other.commit()
+                self.interleaved = True
+            except sqlite3.OperationalError:
+                self.interleaved = False
+            finally:
+                other.close()
+        return self._cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _replay(changes):
+    state = {}
+    for change in changes:
+        if change['op'] == 'insert':
+            state[change['expense_id']] = change['notes']
+        else:
+            state.pop(change['expense_id'], None)
+    return state
+
+
+def test_delete_logs_rows_inserted_concurrently(temp_db, monkeypatch):
+    db_helper.insert_expense(date(2024, 8, 1), 5, "Food", "a")
+    real_get_db_cursor = db_helper.get_db_cursor
+    proxies = []
+
+    @contextmanager
+    def interleaving_get_db_cursor(commit=False):
+        with real_get_db_cursor(commit) as cursor:
+            proxies.append(_InterleavingCursor(cursor, temp_db))
+            yield proxies[-1]
+
+    monkeypatch.setattr(db_helper, 'get_db_cursor', interleaving_get_db_cursor)
+    db_helper.delete_expenses_for_date(date(2024, 8, 1))
+    monkeypatch.setattr(db_helper, 'get_db_cursor', real_get_db_cursor)
+
+    with db_helper.get_db_cursor() as cursor:
+        cursor.execute("SELECT id, notes FROM expenses")
+        table = {row['id']: row['notes'] for row in cursor.fetchall()}
+    assert _replay(db_helper.read_changes(0)['changes']) == table
+    # The delete holds the write lock, so the second writer is locked out
+    assert proxies[0].interleaved is False
@@ -0,0 +1,255 @@
+import time
+from datetime import date, datetime, timezone
+
+import pytest
+
+from frontend import db_helper
+from frontend.summary_precompute import SummaryPrecomputer, rolling_ranges
+
+TODAY = date(2024, 8, 15)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Replace the db_helper calls used by the precomputer with in-memory fakes."""
+    state = {"changes": [], "summaries": [], "on_summary": None, "stale": False, "reads": []}
+
+    def read_changes(since=0, limit=1000, epoch=None):
+        state["reads"].append((since, epoch))
+        if state["stale"]:
+            state["stale"] = False
+            return {"changes": [], "epoch": 1, "stale": True}
+        changes = [c for c in state["changes"] if c['seq'] > since][:limit]
+        return {"changes": changes, "epoch": 0, "stale": False}
+
+    def fetch_expense_summary(start_date, end_date):
+        state["summaries"].append((start_date, end_date))
+        if state["on_summary"]:
+            state["on_summary"]()
+        return [{"category": "Food", "total": 10.0}]
+
+    monkeypatch.setattr(db_helper, 'read_changes', read_changes)
+    monkeypatch.setattr(db_helper, 'fetch_expense_summary', fetch_expense_summary)
+    monkeypatch.setattr(db_helper, 'fetch_latest_change_seq', lambda: 42)
+    return state
+
+
+def test_rolling_ranges_in_january():
+    ranges = rolling_ranges(date(2025, 1, 10))
+
+    assert ranges["this_month"] == (date(2025, 1, 1), date(2025, 1, 10))
+    assert ranges["last_month"] == (date(2024, 12, 1), date(2024, 12, 31))
+    assert ranges["trailing_30_days"] == (date(2024, 12, 12), date(2025, 1, 10))
+
+
+def test_ytd_on_first_of_january():
+    assert rolling_ranges(date(2025, 1, 1))["ytd"] == (date(2025, 1, 1), date(2025, 1, 1))
+
+
+def test_unknown_range_is_rejected():
+    with pytest.raises(ValueError):
+        SummaryPrecomputer(range_names=["next_decade"])
+
+
+def test_lookup_counts_hits_and_misses(fake_db):
+    precomputer = SummaryPrecomputer(range_names=["this_month"], today=lambda: TODAY)
+    precomputer.refresh()
+
+    assert precomputer.lookup(date(2024, 8, 1), TODAY) == [{"category": "Food", "total": 10.0}]
+    assert precomputer.lookup(date(2024, 8, 2), TODAY) is None
+
+    metrics = precomputer.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_change_in_range_refreshes_only_that_range(fake_db):
+    precomputer = SummaryPrecomputer(range_names=["this_month", "last_month"], today=lambda: TODAY)
+    precomputer.refresh()
+    fake_db["summaries"].clear()
+    fake_db["changes"].append({"seq": 1, "op": "insert", "expense_date": "2024-08-03",
+                               "created_at": "2024-08-15 10:00:00"})
+
+    precomputer.refresh()
+
+    assert fake_db["summaries"] == [(date(2024, 8, 1), TODAY)]
+
+
+def test_stale_range_misses_while_recomputing(fake_db):
+    precomputer = SummaryPrecomputer(range_names=["this_month"], today=lambda: TODAY)
+    precomputer.refresh()
+    lookups = []
+    fake_db["on_summary"] = lambda: lookups.append(precomputer.lookup(date(2024, 8, 1), TODAY))
+    fake_db["changes"].append({"seq": 1, "op": "delete", "expense_date": "2024-08-03",
+                               "created_at": "2024-08-15 10:00:00"})
+
+    precomputer.refresh()
+
+    assert lookups == [None]
+    assert precomputer.lookup(date(2024, 8, 1), TODAY) is not None
+
+
+def test_invalidate_during_refresh_discards_result(fake_db):
+    precomputer = SummaryPrecomputer(range_names=["this_month"], today=lambda: TODAY)
+    fake_db["on_summary"] = lambda: precomputer.invalidate(TODAY)
+
+    precomputer.refresh()
+    assert precomputer.lookup(date(2024, 8, 1), TODAY) is None
+
+    fake_db["on_summary"] = None
+    precomputer.refresh()
+    assert precomputer.lookup(date(2024, 8, 1), TODAY) is not None
+
+
+def test_invalidate_outside_ranges_keeps_snapshot(fake_db):
+    precomputer = SummaryPrecomputer(range_names=["this_month"], today=lambda: TODAY)
+    precomputer.refresh()
+
+    precomputer.invalidate(date(2024, 7, 31))
+
+    assert precomputer.lookup(date(2024, 8, 1), TODAY) is not None
+
+
+def test_compacted_position_refreshes_every_range(fake_db):
+    precomputer = SummaryPrecomputer(range_names=["this_month", "last_month"], today=lambda: TODAY)
+    precomputer.refresh()
+    fake_db["summaries"].clear()
+    fake_db["stale"] = True
+
+    precomputer.refresh()
+
+    assert sorted(fake_db["summaries"]) == [(date(2024, 7, 1), date(2024, 7, 31)), (date(2024, 8, 1), TODAY)]
+    # Resumes from the log head with the new epoch
+    precomputer.refresh()
+    assert fake_db["reads"][-1] == (42, 1)
+
+
+def test_day_rollover_recomputes_shifted_ranges(fake_db):
+    today = {"value": TODAY}
+    precomputer = SummaryPrecomputer(today=lambda: today["value"])
+    precomputer.refresh()
+    fake_db["summaries"].clear()
+    tomorrow = date(2024, 8, 16)
+
+    today["value"] = tomorrow
+    assert precomputer.lookup(date(2024, 8, 1), tomorrow) is None
+    precomputer.refresh()
+
+    assert sorted(fake_db["summaries"]) == [
+        (date(2024, 1, 1), tomorrow),
+        (date(2024, 7, 18), tomorrow),
+        (date(2024, 8, 1), tomorrow),
+    ]
+    assert precomputer.lookup(date(2024, 8, 1), tomorrow) is not None
+    assert precomputer.lookup(date(2024, 8, 1), TODAY) is None
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_background_thread_follows_writes_from_other_processes(temp_db):
+    today = date.today()
+    month_start = today.replace(day=1)
+    db_helper.insert_expense(today, 10, "Food", "before start")
+    precomputer = SummaryPrecomputer(range_names=["this_month"], interval=0.05)
+
+    precomputer.start()
+    try:
+        assert _wait_for(lambda: precomputer.lookup(month_start, today) is not None)
+        # Written straight through db_helper, as the Streamlit app does, so no invalidate()
+        db_helper.insert_expense(today, 5, "Rent", "external")
+        assert _wait_for(lambda: {row['category'] for row in precomputer.lookup(month_start, today) or []}
+                         == {"Food", "Rent"})
+    finally:
+        precomputer.stop()
+
+    assert precomputer._thread is None
+    assert precomputer.metrics()["last_freshness_lag_seconds"] < 1
+
+
+def test_get_analytics_serves_precomputed_summary(temp_db, monkeypatch):
+    import api
+    from fastapi.testclient import TestClient
+
+    today = date.today()
+    month_start = today.replace(day=1)
+    db_helper.insert_expense(today, 30, "Food", "lunch")
+    db_helper.insert_expense(today, 10, "Rent", "share")
+    monkeypatch.setattr(api, 'precomputer', SummaryPrecomputer(range_names=["this_month"], interval=0.05))
+
+    with TestClient(api.app) as client:
+        assert _wait_for(lambda: client.get("/analytics/metrics").json()["ranges"])
+
+        def cold_query(*args):
+            raise AssertionError("this_month should be served from the precomputed summary")
+
+        monkeypatch.setattr(api, 'fetch_expense_summary', cold_query)
+        body = client.post("/analytics/", json={"start_date": str(month_start), "end_date": str(today)}).json()
+        metrics = client.get("/analytics/metrics").json()
+
+    assert body == {"Food": {"total": 30.0, "percentage": 75.0}, "Rent": {"total": 10.0, "percentage": 25.0}}
+    assert metrics["hits"] == 1
+    assert api.precomputer._thread is None
+
+
+def _created_at(seconds_ago):
+    """Change log `created_at` for a write `seconds_ago` seconds in the past."""
+    moment = datetime.fromtimestamp(time.time() - seconds_ago, tz=timezone.utc)
+    return moment.strftime("%Y-%m-%d %H:%M:%S.") + f"{moment.microsecond // 1000:03d}"
+
+
+def test_freshness_lag_is_measured_from_change_timestamp(fake_db):
+    precomputer = SummaryPrecomputer(range_names=["this_month"], today=lambda: TODAY)
+    precomputer.refresh()
+    fake_db["changes"].append({"seq": 1, "op": "insert", "expense_date": "2024-08-03",
+                               "created_at": _created_at(1.25)})
+
+    precomputer.refresh()
+
+    metrics = precomputer.metrics()
+    assert 1.25 <= metrics["last_freshness_lag_seconds"] < 1.5
+    assert metrics["max_freshness_lag_seconds"] == metrics["last_freshness_lag_seconds"]
+
+
+def test_freshness_lag_tracks_maximum(fake_db):
+    precomputer = SummaryPrecomputer(range_names=["this_month"], today=lambda: TODAY)
+    precomputer.refresh()
+    for seq, seconds_ago in ((1, 2.0), (2, 0.5)):
+        fake_db["changes"].append({"seq": seq, "op": "insert", "expense_date": "2024-08-03",
+                                   "created_at": _created_at(seconds_ago)})
+        precomputer.refresh()
+
+    metrics = precomputer.metrics()
+    assert 0.5 <= metrics["last_freshness_lag_seconds"] < 0.75
+    assert 2.0 <= metrics["max_freshness_lag_seconds"] < 2.25
+
+
+def test_run_logs_first_failure_and_recovery_with_backoff(monkeypatch):
+    import frontend.summary_precompute as summary_precompute
+
+    precomputer = SummaryPrecomputer(range_names=["this_month"], interval=0.001, today=lambda: TODAY)
+    logged, waits, attempts = [], [], []
+    monkeypatch.setattr(summary_precompute.logger, 'error', lambda msg: logged.append(('error', msg)))
+    monkeypatch.setattr(summary_precompute.logger, 'info', lambda msg: logged.append(('info', msg)))
+
+    def refresh():
+        attempts.append(1)
+        if len(attempts) <= 3:
+            raise RuntimeError("database is locked")
+        precomputer._stop.set()
+
+    def wait(timeout):
+        waits.append(timeout)
+        return False
+
+    monkeypatch.setattr(precomputer, 'refresh', refresh)
+    monkeypatch.setattr(precomputer._wakeup, 'wait', wait)
+    precomputer._run()
+
+    assert [level for level, _ in logged] == ['error', 'info']
+    assert waits == [0.002, 0.004, 0.008, 0.001]